@@ -0,0 +1,163 @@
+"""
+API HTTP de registros (procedimientos y actividades) sobre la misma capa de
+datos que la app Streamlit: repositorios, coordinador de escrituras e
+importación masiva de app.py. Puede correr junto a la UI o en su lugar:
+
+    API_TOKEN=secreto python api.py                      # servidor de desarrollo
+    API_TOKEN=secreto gunicorn --threads 16 api:api       # producción
+
+Todas las rutas exigen el encabezado "Authorization: Bearer <API_TOKEN>".
+Las altas individuales concurrentes se agrupan en el coordinador de
+escrituras (una escritura local y una transacción en la DB por lote); para
+cargas grandes usar POST /api/<tipo>/lote.
+
+Rutas (<tipo> = procedimientos | actividades):
+    POST  /api/<tipo>                         alta de un registro
+    POST  /api/<tipo>/lote                    alta masiva (lista de registros)
+    GET   /api/<tipo>/<id>                    registro por ID
+    GET   /api/<tipo>?profesional=...         registros del profesional (paginado por after_id)
+    PATCH /api/procedimientos/<id>            actualiza Subido a Panacea / Novedad
+    GET   /metrics                            mediciones de este proceso (texto Prometheus)
+"""
+import os
+import hmac
+from datetime import datetime
+
+import pandas as pd
+from flask import Flask, Response, jsonify, request, abort, g
+
+import app as store
+
+store.silence_bare_mode_warnings()
+
+API_TOKEN = os.environ.get('API_TOKEN', '')
+API_PAGE_MAX = 500
+API_BATCH_MAX = int(os.environ.get('API_BATCH_MAX', 20000))
+# Campos modificables por la API (igual que la búsqueda pública de la UI)
+PATCH_FIELDS = ('Subido a Panacea', 'Novedad')
+
+api = Flask(__name__)
+
+def error(status, message):
+    return jsonify({'error': message}), status
+
+def repository(kind):
+    if kind not in store.LOCAL_STORES:
+        abort(404)
+    return store.get_repository(kind)
+
+def now_str():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+@api.before_request
+def start_trace():
+    # Una traza por solicitud (antes del token: también se miden las rechazadas)
+    rule = request.url_rule.rule if request.url_rule else 'sin_ruta'
+    g.perf_trace = store.get_perf_recorder().begin_trace(f'api {request.method} {rule}')
+
+@api.teardown_request
+def end_trace(exc):
+    trace = g.pop('perf_trace', None)
+    if trace is not None:
+        store.get_perf_recorder().end_trace(trace)
+
+@api.before_request
+def check_token():
+    if not API_TOKEN:
+        return error(503, "API_TOKEN no configurado en el servidor")
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f'Bearer {API_TOKEN}'.encode()):
+        return error(401, "Token inválido")
+
+@api.errorhandler(404)
+def not_found(e):
+    return error(404, "No encontrado")
+
+@api.post('/api/<kind>')
+def create_record(kind):
+    """Valida como la importación masiva y encola el alta en el coordinador"""
+    repo = repository(kind)
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return error(400, "Se espera un objeto JSON")
+    prof_map = store.load_catalog().get('prof_map', {})
+    df, reasons = store.normalize_import_chunk(kind, pd.DataFrame([body]), prof_map, now_str())
+    if reasons.iloc[0]:
+        return error(400, reasons.iloc[0])
+    new_id = repo.insert(df.iloc[0].to_dict())
+    return jsonify({'ID': int(new_id), 'aviso': repo.last_warning}), 201
+
+@api.post('/api/<kind>/lote')
+def create_batch(kind):
+    """Alta masiva: {"registros": [...]} o la lista directa; reporta las filas rechazadas por posición"""
+    repository(kind)
+    body = request.get_json(silent=True)
+    records = body.get('registros') if isinstance(body, dict) else body
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        return error(400, "Se espera una lista de registros")
+    if len(records) > API_BATCH_MAX:
+        return error(413, f"Máximo {API_BATCH_MAX} registros por lote")
+
+    report = store.import_records(kind, [(None, pd.DataFrame(records), 1.0)])
+    rejected = report['rechazadas']
+    return jsonify({
+        'recibidos': report['leidas'],
+        'importados': report['importadas'],
+        'ids': list(report['ids']) if report['ids'] else None,
+        'rechazados': [
+            {'posicion': int(row['Fila']), 'motivo': row['Motivo']}
+            for row in rejected[['Fila', 'Motivo']].to_dict('records')
+        ],
+        'aviso': report['aviso'],
+    })
+
+@api.get('/api/<kind>/<int:record_id>')
+def get_record(kind, record_id):
+    rows = store.frame_to_rows(repository(kind).find('ID', record_id))
+    if not rows:
+        return error(404, f"ID {record_id} no encontrado")
+    return jsonify(rows[0])
+
+@api.get('/api/<kind>')
+def list_by_professional(kind):
+    """Paginación keyset: pasar 'siguiente' como after_id para la página siguiente"""
+    repo = repository(kind)
+    profesional = request.args.get('profesional', '').strip()
+    if not profesional:
+        return error(400, "Parámetro 'profesional' requerido")
+    limit = max(1, min(request.args.get('limit', store.PAGE_SIZE, type=int), API_PAGE_MAX))
+    after_id = request.args.get('after_id', type=int)
+    page, total, next_after = repo.page({'profesional': profesional}, after_id, limit)
+    return jsonify({'registros': store.frame_to_rows(page), 'total': int(total), 'siguiente': next_after})
+
+@api.patch('/api/procedimientos/<int:record_id>')
+def update_procedure(record_id):
+    repo = repository('procedimientos')
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not body or set(body) - set(PATCH_FIELDS):
+        return error(400, f"Solo se pueden modificar: {', '.join(PATCH_FIELDS)}")
+
+    fields = {}
+    if 'Subido a Panacea' in body:
+        panacea = store.PANACEA_IMPORT_VALUES.get(str(body['Subido a Panacea']).strip().lower())
+        if panacea is None:
+            return error(400, "Subido a Panacea debe ser Sí o No")
+        fields['Subido a Panacea'] = panacea
+    if 'Novedad' in body:
+        fields['Novedad'] = '' if body['Novedad'] is None else str(body['Novedad'])
+    if repo.get(record_id) is None:
+        return error(404, f"ID {record_id} no encontrado")
+    fields['Modificado'] = now_str()
+    repo.update(record_id, fields)
+    return jsonify({'ID': record_id, 'aviso': repo.last_warning})
+
+@api.get('/metrics')
+def metrics():
+    return Response(store.perf_prometheus_text(store.get_perf_recorder()), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    api.run(
+        host=os.environ.get('API_HOST', '127.0.0.1'),
+        port=int(os.environ.get('API_PORT', 8000)),
+        threaded=True
+    )
@@ -0,0 +1,412 @@
+"""
+Benchmarks reproducibles de la capa de datos de app.py.
+
+Genera registros sintéticos con semilla fija (profesionales y municipios con
+distribución sesgada, nombres con tildes, fechas de ~3 años) y mide las
+operaciones de la app por almacén y tamaño. Cada combinación corre en un
+subproceso con su propio directorio de datos (APP_DATA_DIR), así las cachés
+y la memoria de una corrida no contaminan a la siguiente.
+
+    python benchmark.py                                   # csv y sqlite, 1k a 1M filas
+    python benchmark.py --sizes 1000,10000 --backends csv,parquet,sqlite
+    BENCH_PG_URL=postgresql://... python benchmark.py --backends postgres
+    python benchmark.py --output nuevo.json --compare anterior.json
+
+El JSON de salida trae los metadatos de la corrida (commit, versiones,
+semilla) y por operación el mínimo y la mediana de --repeat repeticiones y
+el pico de memoria (tracemalloc, en una pasada aparte para no inflar los
+tiempos). BENCH_PG_URL debe apuntar a una base desechable: se borran las
+tablas de la app.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import importlib.util
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ('csv', 'parquet', 'sqlite', 'postgres')
+DEFAULT_SIZES = '1000,10000,100000,1000000'
+DEFAULT_SEED = 2024
+# Una operación es regresión si su mediana empeora más que este factor y,
+# para no marcar ruido en operaciones de milisegundos, más que este margen
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.01
+
+NOMBRES = [
+    'María', 'José', 'Luis', 'Ana', 'Carlos', 'Lucía', 'Jorge', 'Sofía', 'Andrés',
+    'Valentina', 'Juan', 'Camila', 'Pedro', 'Daniela', 'Óscar', 'Ángela', 'Iván', 'Inés'
+]
+APELLIDOS = [
+    'Gómez', 'Rodríguez', 'Martínez', 'Pérez', 'Núñez', 'Hernández', 'López', 'García',
+    'Díaz', 'Muñoz', 'Rojas', 'Castaño', 'Peña', 'Ibáñez', 'Zúñiga', 'Ordóñez'
+]
+MUNICIPIOS = [
+    'Cali', 'Palmira', 'Buga', 'Tuluá', 'Cartago', 'Jamundí', 'Yumbo', 'Candelaria',
+    'Florida', 'Pradera', 'El Cerrito', 'Ginebra', 'Guacarí', 'Roldanillo', 'Sevilla',
+    'Zarzal', 'Caicedonia', 'La Unión', 'Toro', 'Dagua', 'Bugalagrande', 'Andalucía'
+]
+PROCEDIMIENTOS = [
+    'Consulta de control', 'Toma de muestra', 'Curación', 'Vacunación', 'Tamizaje visual',
+    'Citología', 'Valoración nutricional', 'Educación en salud', 'Visita domiciliaria',
+    'Atención psicosocial', 'Planificación familiar', 'Crecimiento y desarrollo'
+]
+NOVEDADES = ['Paciente no asistió', 'Reprogramado', 'Pendiente autorización', 'Sin novedad']
+ACTIVIDADES = [
+    'Reunión de equipo', 'Jornada de vacunación', 'Capacitación', 'Seguimiento telefónico',
+    'Búsqueda activa', 'Informe mensual', 'Brigada de salud'
+]
+
+# --- GENERADOR DE DATOS ---
+
+def skewed_choice(rng, values, size, exponent=1.1):
+    """Muestra con pesos Zipf: el primer valor es el más frecuente"""
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    idx = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return np.asarray(values, dtype=object)[idx]
+
+def random_names(rng, size):
+    nombres = np.asarray(NOMBRES, dtype=object)[rng.integers(0, len(NOMBRES), size)]
+    apellidos = np.asarray(APELLIDOS, dtype=object)[rng.integers(0, len(APELLIDOS), size)]
+    segundos = np.asarray(APELLIDOS, dtype=object)[rng.integers(0, len(APELLIDOS), size)]
+    return nombres + ' ' + apellidos + ' ' + segundos
+
+def random_dates(rng, size, days=1095):
+    base = pd.Timestamp('2023-01-01')
+    return base + pd.to_timedelta(rng.integers(0, days, size), unit='D')
+
+def random_timestamps(rng, dates):
+    seconds = rng.integers(7 * 3600, 19 * 3600, len(dates))
+    return (dates + pd.to_timedelta(seconds, unit='s')).strftime('%Y-%m-%d %H:%M:%S')
+
+def generate_pools(rng, size):
+    """Profesionales, municipios y procedimientos; crecen (hasta un tope) con el tamaño"""
+    n_prof = min(2000, max(20, size // 200))
+    names = pd.unique(random_names(rng, n_prof * 2))[:n_prof]
+    docs = rng.choice(np.arange(10_000_000, 99_999_999), size=len(names), replace=False).astype(str)
+    municipios = MUNICIPIOS + [f'Vereda {i:03d}' for i in range(min(150, size // 1000))]
+    procedimientos = PROCEDIMIENTOS + [f'Procedimiento {i:04d}' for i in range(300)]
+    return {
+        'profesionales': list(names),
+        'prof_map': dict(zip(names, docs)),
+        'municipios': municipios,
+        'procedimientos': procedimientos,
+    }
+
+def generate_procedures(rng, size, pools, headers):
+    prof = skewed_choice(rng, pools['profesionales'], size)
+    fechas = random_dates(rng, size)
+    creado = random_timestamps(rng, fechas)
+    modificado = np.where(rng.random(size) < 0.2, creado, '')
+    novedad = np.where(rng.random(size) < 0.1, skewed_choice(rng, NOVEDADES, size), '')
+    df = pd.DataFrame({
+        'ID': np.arange(1, size + 1),
+        'Nombre profesional': prof,
+        'Documento profesional': pd.Series(prof).map(pools['prof_map']).to_numpy(),
+        'Nombre paciente': random_names(rng, size),
+        'Documento paciente': rng.integers(1_000_000, 9_999_999_999, size).astype(str),
+        'Municipio': skewed_choice(rng, pools['municipios'], size, exponent=1.3),
+        'Fecha inicio': fechas.strftime('%Y-%m-%d'),
+        'Procedimiento': skewed_choice(rng, pools['procedimientos'], size),
+        'Subido a Panacea': np.where(rng.random(size) < 0.7, 'Sí', 'No'),
+        'Novedad': novedad,
+        'Creado': creado,
+        'Modificado': modificado,
+    })
+    return df.reindex(columns=headers, fill_value='')
+
+def generate_activities(rng, size, pools, headers):
+    fechas = random_dates(rng, size)
+    df = pd.DataFrame({
+        'ID': np.arange(1, size + 1),
+        'Fecha': fechas.strftime('%Y-%m-%d'),
+        'Nombre profesional': skewed_choice(rng, pools['profesionales'], size),
+        'Procedimiento': skewed_choice(rng, pools['procedimientos'], size),
+        'Actividad': skewed_choice(rng, ACTIVIDADES, size),
+        'Creado': random_timestamps(rng, fechas),
+        'Modificado': '',
+    })
+    return df.reindex(columns=headers, fill_value='')
+
+# --- MEDICIÓN ---
+
+def measure(name, fn, repeat, memory, setup=None):
+    """Tiempos de repeat corridas y, aparte, el pico de memoria de una corrida"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return {
+        'operacion': name,
+        'repeticiones': repeat,
+        'seg_min': min(times),
+        'seg_mediana': statistics.median(times),
+        'pico_mb': peak_mb,
+    }
+
+def reset_database(app, db_url):
+    """Borra las tablas (y secuencias) de la app en la base desechable"""
+    from sqlalchemy import create_engine, text
+    engine = create_engine(db_url)
+    app.db_metadata.drop_all(engine)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            for kind in app.LOCAL_STORES:
+                conn.execute(text(f'DROP SEQUENCE IF EXISTS "{kind}_id_seq"'))
+    engine.dispose()
+
+def run_worker(backend, size, args):
+    """Corre todas las operaciones de un (almacén, tamaño) en este proceso"""
+    data_dir = tempfile.mkdtemp(prefix=f'bench_{backend}_{size}_')
+    os.environ['APP_DATA_DIR'] = data_dir
+    os.environ['LOCAL_STORE_FORMAT'] = 'parquet' if backend == 'parquet' else 'csv'
+    # El espejo Excel es trabajo de fondo: no debe correr durante las mediciones
+    os.environ['EXCEL_MIRROR_DEBOUNCE'] = '1e9'
+
+    db_url = None
+    if backend == 'sqlite':
+        db_url = 'sqlite:///' + os.path.join(data_dir, 'benchmark.db')
+    elif backend == 'postgres':
+        db_url = os.environ['BENCH_PG_URL']
+    # st.secrets se lee del directorio actual
+    os.chdir(data_dir)
+    if db_url:
+        os.makedirs('.streamlit')
+        with open(os.path.join('.streamlit', 'secrets.toml'), 'w', encoding='utf-8') as f:
+            f.write(f'db_url = {json.dumps(db_url)}\n')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+    app.silence_bare_mode_warnings()
+
+    results = []
+    try:
+        rng = np.random.default_rng([args.seed, size])
+        pools = generate_pools(rng, size)
+        procedures = generate_procedures(rng, size, pools, app.DATA_HEADERS)
+        activities = generate_activities(rng, size, pools, app.DATA_ACTIVITIES_HEADERS)
+        procedures.to_csv(app.DATA_PATH, index=False)
+        activities.to_csv(app.DATA_ACTIVITIES_PATH, index=False)
+        app.save_catalog({
+            'nombre_prof': pools['profesionales'],
+            'doc_prof': sorted(pools['prof_map'].values()),
+            'municipio': pools['municipios'],
+            'procedimiento': pools['procedimientos'],
+            'prof_map': pools['prof_map'],
+        })
+
+        def record(name, fn, setup=None, repeat=args.repeat, memory=not args.no_memory):
+            result = measure(name, fn, repeat, memory, setup)
+            results.append(result)
+            pico = '' if result['pico_mb'] is None else f"  pico {result['pico_mb']:9.1f} MB"
+            print(f"  {backend:<9}{size:>9}  {name:<28}{result['seg_mediana']:10.4f} s{pico}", flush=True)
+
+        # Preparación del almacén local (en parquet incluye la migración desde CSV)
+        record('prepare_store', lambda: [app.prepare_local_store(kind) for kind in app.LOCAL_STORES],
+               repeat=1, memory=False)
+        if db_url:
+            reset_database(app, db_url)
+            # Primer engine: crea el esquema y copia la base local por bloques
+            record('db_bootstrap_transfer', app.get_db_connection, repeat=1, memory=False)
+            if app.get_db_connection() is None:
+                raise RuntimeError(f"No se pudo conectar a {backend}")
+
+        engine = app.get_db_connection()
+        proc_repo = app.get_repository('procedimientos')
+        act_repo = app.get_repository('actividades')
+        top_prof = pools['profesionales'][0]
+        top_mun = pools['municipios'][0]
+        # Primera mitad del período: obliga a agregar (no sirve el resumen)
+        fechas = activities['Fecha'].sort_values()
+        date_range = {
+            'fecha_desde': datetime.strptime(fechas.iloc[0], '%Y-%m-%d').date(),
+            'fecha_hasta': datetime.strptime(fechas.iloc[len(fechas) // 2], '%Y-%m-%d').date(),
+        }
+
+        def cold_cache():
+            for entry in app.get_dataset_cache().values():
+                entry['version'] = None
+                entry['df'] = None
+                entry['indexes'] = {}
+
+        def drop_summary():
+            if engine is None:
+                if os.path.exists(app.SUMMARY_PATH):
+                    os.remove(app.SUMMARY_PATH)
+            else:
+                with engine.begin() as conn:
+                    conn.execute(app.resumen_metricas_table.delete())
+
+        # Lecturas primero: las escrituras del final cambian la versión de datos
+        record('load_cold', app.load_data_procedimientos, setup=cold_cache)
+        record('load_cached', app.load_data_procedimientos)
+        df = app.load_data_procedimientos()
+        record('get_next_id', lambda: app.get_next_id(df))
+        record('find_professional', lambda: proc_repo.find('Nombre profesional', top_prof))
+        record('page_filtered', lambda: proc_repo.page({'profesional': top_prof, 'municipio': top_mun}))
+        record('aggregate_activities', lambda: act_repo.aggregate('Nombre profesional', date_range))
+        record('metrics_rebuild', proc_repo.metrics, setup=drop_summary)
+        record('metrics_summary', proc_repo.metrics)
+        record('extract_catalog', lambda: app.extract_catalog(procedures))
+        record('export_csv_gzip', lambda: app.export_bytes(proc_repo, {'profesional': top_prof}, 'csv', 'gzip'))
+        if size <= args.max_excel_rows:
+            record('generate_excel_bytes', lambda: app.generate_excel_bytes(df))
+
+        record('allocate_ids', lambda: proc_repo.allocate_ids(1))
+        row = procedures.iloc[0].to_dict()
+        record('insert_one', lambda: proc_repo.insert(dict(row, ID=None)))
+        first_id = int(df['ID'].iloc[0])
+        record('save_one', lambda: app.save_data_procedimientos(df, changed_ids=[first_id]))
+        record('update_one', lambda: proc_repo.update(first_id, {'Novedad': 'Revisado'}))
+    finally:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    rss_mb = None
+    try:
+        import resource
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        pass
+    return [dict(r, almacen=backend, filas=size, rss_max_mb=rss_mb) for r in results]
+
+# --- ORQUESTACIÓN ---
+
+def run_metadata(args, backends, sizes):
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import sqlalchemy
+    return {
+        'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': commit,
+        'semilla': args.seed,
+        'repeticiones': args.repeat,
+        'almacenes': backends,
+        'tamanos': sizes,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sqlalchemy': sqlalchemy.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare(results, old_path):
+    """Imprime la razón nueva/anterior de la mediana por operación"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = {
+            (r['almacen'], r['filas'], r['operacion']): r
+            for r in json.load(f)['resultados']
+        }
+    print(f"\nComparación con {old_path} (razón de medianas, >1 = más lento):")
+    regressions = 0
+    for r in results:
+        before = old.get((r['almacen'], r['filas'], r['operacion']))
+        if not before or not before['seg_mediana']:
+            continue
+        ratio = r['seg_mediana'] / before['seg_mediana']
+        slower = r['seg_mediana'] - before['seg_mediana'] > REGRESSION_MIN_SECONDS
+        flag = '  REGRESIÓN' if ratio > REGRESSION_RATIO and slower else ''
+        if flag:
+            regressions += 1
+        print(f"  {r['almacen']:<9}{r['filas']:>9}  {r['operacion']:<28}{ratio:8.2f}x{flag}")
+    return regressions
+
+def main():
+    default_backends = ['csv', 'sqlite']
+    if importlib.util.find_spec('pyarrow'):
+        default_backends.insert(1, 'parquet')
+    if os.environ.get('BENCH_PG_URL'):
+        default_backends.append('postgres')
+
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa de datos de app.py")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Cantidades de filas, separadas por coma")
+    parser.add_argument('--backends', default=','.join(default_backends), help=f"Almacenes: {', '.join(BACKENDS)}")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por operación")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--max-excel-rows', type=int, default=100000,
+                        help="Tamaño máximo para medir la generación del Excel completo")
+    parser.add_argument('--no-memory', action='store_true', help="Omite la pasada de tracemalloc")
+    parser.add_argument('--output', help="Archivo JSON de resultados (por defecto benchmark_<fecha>.json)")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--worker', nargs=3, metavar=('ALMACEN', 'FILAS', 'SALIDA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, size, out_path = args.worker
+        results = run_worker(backend, int(size), args)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Almacenes desconocidos: {', '.join(sorted(unknown))}")
+    if 'postgres' in backends and not os.environ.get('BENCH_PG_URL'):
+        parser.error("El almacén postgres requiere BENCH_PG_URL")
+
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report = {'metadatos': run_metadata(args, backends, sizes), 'resultados': [], 'fallidos': []}
+    passthrough = ['--repeat', str(args.repeat), '--seed', str(args.seed),
+                   '--max-excel-rows', str(args.max_excel_rows)]
+    if args.no_memory:
+        passthrough.append('--no-memory')
+
+    for backend in backends:
+        for size in sizes:
+            fd, out_path = tempfile.mkstemp(suffix='.json')
+            os.close(fd)
+            try:
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--worker', backend, str(size), out_path] + passthrough
+                )
+                if proc.returncode != 0:
+                    print(f"  {backend} {size}: falló (código {proc.returncode})")
+                    report['fallidos'].append({'almacen': backend, 'filas': size, 'codigo': proc.returncode})
+                    continue
+                with open(out_path, 'r', encoding='utf-8') as f:
+                    report['resultados'].extend(json.load(f))
+            finally:
+                os.remove(out_path)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados en {output}")
+
+    if args.compare:
+        regressions = compare(report['resultados'], args.compare)
+        print(f"{regressions} regresiones")
+    return 1 if report['fallidos'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())